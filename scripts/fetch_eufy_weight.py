@@ -4,6 +4,7 @@
 from __future__ import annotations
 
 import datetime as dt
+import functools
 import json
 import os
 import sys
@@ -11,7 +12,22 @@ import urllib.error
 import urllib.parse
 import urllib.request
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import rapidjson
+except ImportError:  # pragma: no cover - optional speedup
+    rapidjson = None
+
+try:
+    import urllib3
+except ImportError:  # pragma: no cover - optional speedup
+    urllib3 = None
 
 API_BASE = os.getenv("EUFY_API_BASE", "https://home-api.eufylife.com/v1").rstrip("/")
 LOGIN_PATH = os.getenv("EUFY_LOGIN_PATH", "/user/v2/email/login")
@@ -25,6 +41,61 @@ FORCE_DEVICE_ID = os.getenv("EUFY_DEVICE_ID")
 TIMEOUT = int(os.getenv("EUFY_TIMEOUT_SECONDS", "20"))
 TARGET_WEIGHT_KG_RAW = os.getenv("TARGET_WEIGHT_KG")
 
+# All API calls hit the same host, so a pooled client keeps one TLS connection alive across them.
+_HTTP = (
+    urllib3.PoolManager(
+        num_pools=1,
+        maxsize=4,
+        timeout=TIMEOUT,
+        # raise_on_status=False hands an exhausted 429/503 retry back as a response, so it reports as "HTTP <status>".
+        retries=urllib3.Retry(total=2, backoff_factor=0.3, raise_on_status=False),
+    )
+    if urllib3 is not None
+    else None
+)
+
+
+# Parse/encode with the fastest available backend: orjson, then python-rapidjson, then stdlib json.
+# Every backend raises a ValueError subclass on malformed input or invalid UTF-8.
+def _json_loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    if rapidjson is not None:
+        return rapidjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_dumps(value: Any, pretty: bool = False) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if rapidjson is not None:
+        return rapidjson.dumps(value, indent=2 if pretty else None).encode("utf-8")
+    if pretty:
+        return json.dumps(value, ensure_ascii=True, indent=2).encode("utf-8")
+    return json.dumps(value).encode("utf-8")
+
+
+def _send(method: str, url: str, body: bytes | None, headers: dict[str, str]) -> bytes:
+    if _HTTP is not None:
+        try:
+            resp = _HTTP.request(method, url, body=body, headers=headers)
+        except urllib3.exceptions.HTTPError as err:
+            raise RuntimeError(f"Network error for {url}: {err}") from err
+        if resp.status >= 400:
+            detail = resp.data.decode("utf-8", errors="replace")
+            raise RuntimeError(f"HTTP {resp.status} {url}: {detail[:250]}")
+        return resp.data
+
+    req = urllib.request.Request(url=url, method=method, data=body, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=TIMEOUT) as resp:
+            return resp.read()
+    except urllib.error.HTTPError as err:
+        detail = err.read().decode("utf-8", errors="replace")
+        raise RuntimeError(f"HTTP {err.code} {url}: {detail[:250]}") from err
+    except urllib.error.URLError as err:
+        raise RuntimeError(f"Network error for {url}: {err}") from err
+
 
 def _request_json(method: str, path: str, headers: dict[str, str] | None = None, payload: dict[str, Any] | None = None) -> Any:
     url = f"{API_BASE}{path}"
@@ -33,92 +104,143 @@ def _request_json(method: str, path: str, headers: dict[str, str] | None = None,
     if headers:
         req_headers.update(headers)
     if payload is not None:
-        body = json.dumps(payload).encode("utf-8")
+        body = _json_dumps(payload)
         req_headers.setdefault("Content-Type", "application/json")
-    req = urllib.request.Request(url=url, method=method, data=body, headers=req_headers)
-    try:
-        with urllib.request.urlopen(req, timeout=TIMEOUT) as resp:
-            raw = resp.read()
-    except urllib.error.HTTPError as err:
-        detail = err.read().decode("utf-8", errors="replace")
-        raise RuntimeError(f"HTTP {err.code} {url}: {detail[:250]}") from err
-    except urllib.error.URLError as err:
-        raise RuntimeError(f"Network error for {url}: {err}") from err
-
+    raw = _send(method, url, body, req_headers)
     try:
-        return json.loads(raw.decode("utf-8"))
-    except json.JSONDecodeError as err:
+        return _json_loads(raw)
+    except ValueError as err:
         raise RuntimeError(f"Invalid JSON from {url}") from err
 
 
-def _extract_token(login_json: Any) -> str:
-    candidates: list[Any] = []
-    if isinstance(login_json, dict):
-        candidates.extend([
-            login_json.get("access_token"),
-            login_json.get("token"),
-        ])
-        data = login_json.get("data")
-        if isinstance(data, dict):
-            candidates.extend([
-                data.get("access_token"),
-                data.get("token"),
-                data.get("auth_token"),
-            ])
+_LOGIN_TOKEN_KEYS = ("access_token", "token")
+_LOGIN_DATA_TOKEN_KEYS = ("access_token", "token", "auth_token")
+
+
+def _iter_token_candidates(login_json: Any):
+    if not isinstance(login_json, dict):
+        return
+    for key in _LOGIN_TOKEN_KEYS:
+        yield login_json.get(key)
+    data = login_json.get("data")
+    if isinstance(data, dict):
+        for key in _LOGIN_DATA_TOKEN_KEYS:
+            yield data.get(key)
+
 
-    for token in candidates:
-        if isinstance(token, str) and token:
-            return token
-    raise RuntimeError("Login response did not include an access token")
+def _extract_token(login_json: Any) -> str:
+    token = next((t for t in _iter_token_candidates(login_json) if isinstance(t, str) and t), None)
+    if token is None:
+        raise RuntimeError("Login response did not include an access token")
+    return token
 
 
 def _iter_dicts(value: Any):
-    if isinstance(value, dict):
-        yield value
-        for child in value.values():
-            yield from _iter_dicts(child)
-    elif isinstance(value, list):
-        for item in value:
-            yield from _iter_dicts(item)
+    # Iterative pre-order walk; children are pushed reversed so dicts come out in document order.
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        if type(node) is dict:
+            yield node
+            stack.extend(reversed(node.values()))
+        elif type(node) is list:
+            stack.extend(reversed(node))
+
+
+# Python 3.11+ parses a trailing "Z" natively; older versions need it spelled as an offset.
+if sys.version_info >= (3, 11):
+    def _from_iso(value: str) -> dt.datetime:
+        try:
+            return dt.datetime.fromisoformat(value)
+        except ValueError:
+            # The native parser still rejects some "Z" forms older code accepted, e.g. date-only "2024-01-02Z".
+            return dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+else:  # pragma: no cover - exercised on Python 3.10 only
+    def _from_iso(value: str) -> dt.datetime:
+        return dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _format_utc(moment: dt.datetime) -> str:
+    return moment.isoformat().replace("+00:00", "Z")
 
 
-def _parse_time(value: Any) -> str | None:
-    if value is None:
+class _Timestamp(NamedTuple):
+    iso: str
+    epoch: float
+
+
+def _timestamp_from(moment: dt.datetime) -> _Timestamp:
+    return _Timestamp(_format_utc(moment), moment.timestamp())
+
+
+def _timestamp_from_epoch(ts: float) -> _Timestamp:
+    # Values this large are epoch milliseconds rather than seconds.
+    if ts > 10_000_000_000:
+        ts /= 1000.0
+    return _timestamp_from(dt.datetime.fromtimestamp(ts, dt.timezone.utc))
+
+
+def _parse_time(value: Any) -> _Timestamp | None:
+    if value is None or value == "":
         return None
+    if isinstance(value, (int, float, str)):
+        return _parse_time_cached(value)
+    return None
+
+
+# Sibling records often share a timestamp, so identical raw values are parsed only once.
+@functools.lru_cache(maxsize=1024)
+def _parse_time_cached(value: str | int | float) -> _Timestamp | None:
     if isinstance(value, (int, float)):
-        ts = float(value)
-        if ts > 10_000_000_000:
-            ts /= 1000.0
-        return dt.datetime.fromtimestamp(ts, dt.timezone.utc).isoformat().replace("+00:00", "Z")
+        return _timestamp_from_epoch(float(value))
     if isinstance(value, str):
         v = value.strip()
         if not v:
             return None
+        if len(v) == 20 and v[19] == "Z" and v[10] == "T" and v[4] == v[7] == "-" and v[13] == v[16] == ":":
+            # Canonical shape; one native parse checks the digits and ranges. Python < 3.11 rejects the "Z"
+            # here, so those strings take the general path below.
+            try:
+                moment = dt.datetime.fromisoformat(v)
+            except ValueError:
+                pass
+            else:
+                return _Timestamp(v, moment.timestamp())
         if v.isdigit():
-            return _parse_time(int(v))
+            return _timestamp_from_epoch(float(v))
         try:
-            parsed = dt.datetime.fromisoformat(v.replace("Z", "+00:00"))
+            parsed = _from_iso(v)
             if parsed.tzinfo is None:
                 parsed = parsed.replace(tzinfo=dt.timezone.utc)
-            return parsed.astimezone(dt.timezone.utc).isoformat().replace("+00:00", "Z")
+            return _timestamp_from(parsed.astimezone(dt.timezone.utc))
         except ValueError:
             return None
     return None
 
 
+_UNIT_FACTOR = {
+    "kg": 1.0,
+    "kgs": 1.0,
+    "kilogram": 1.0,
+    "kilograms": 1.0,
+    "lb": 0.45359237,
+    "lbs": 0.45359237,
+    "pound": 0.45359237,
+    "pounds": 0.45359237,
+    "jin": 0.5,
+}
+# Grams divide exactly; multiplying by 0.001 rounds differently for some values.
+_GRAM_UNITS = frozenset({"g", "gram", "grams"})
+
+
 def _to_kg(weight: float, unit: str | None) -> float:
-    if not unit:
-        return _guess_scaled_kg(weight)
-
-    u = unit.strip().lower()
-    if u in {"kg", "kgs", "kilogram", "kilograms"}:
-        return weight
-    if u in {"lb", "lbs", "pound", "pounds"}:
-        return weight * 0.45359237
-    if u in {"g", "gram", "grams"}:
-        return weight / 1000.0
-    if u in {"jin"}:
-        return weight * 0.5
+    if unit:
+        u = unit.strip().lower()
+        factor = _UNIT_FACTOR.get(u)
+        if factor is not None:
+            return weight * factor
+        if u in _GRAM_UNITS:
+            return weight / 1000.0
     # Some Eufy payloads encode weight as scaled integers without a clear unit.
     # Example: 717 means 71.7kg.
     return _guess_scaled_kg(weight)
@@ -135,6 +257,11 @@ def _guess_scaled_kg(raw_weight: float) -> float:
     return raw_weight
 
 
+# Points are distinct bits, so a device's score also records which keywords already matched.
+_DEVICE_KEYWORD_SCORES = (("scale", 4), ("health", 2), ("body", 1))
+_MAX_DEVICE_SCORE = 4 | 2 | 1
+
+
 def _pick_scale_device(devices_json: Any) -> dict[str, Any]:
     devices: list[dict[str, Any]] = []
     if isinstance(devices_json, list):
@@ -156,33 +283,81 @@ def _pick_scale_device(devices_json: Any) -> dict[str, Any]:
                 return d
         raise RuntimeError(f"EUFY_DEVICE_ID={FORCE_DEVICE_ID} was not found")
 
-    scored: list[tuple[int, dict[str, Any]]] = []
+    best_score = -1
+    best_device = devices[0]
     for d in devices:
-        texts = " ".join(str(v).lower() for v in d.values() if isinstance(v, str))
         score = 0
-        if "scale" in texts:
-            score += 4
-        if "health" in texts:
-            score += 2
-        if "body" in texts:
-            score += 1
-        scored.append((score, d))
+        for v in d.values():
+            if not isinstance(v, str):
+                continue
+            text = v.lower()
+            for keyword, points in _DEVICE_KEYWORD_SCORES:
+                if not score & points and keyword in text:
+                    score |= points
+            if score == _MAX_DEVICE_SCORE:
+                break
+        if score > best_score:
+            best_score = score
+            best_device = d
+            if score == _MAX_DEVICE_SCORE:
+                break
+
+    return best_device
+
+
+# Tuples keep lookup priority; the sets let nodes without any candidate key be skipped cheaply.
+_TIME_KEYS = ("time", "timestamp", "measureTime", "measuredAt", "created_at", "createdAt", "date")
+_WEIGHT_KEYS = ("weight", "weight_kg", "weightKg", "body_weight", "bodyWeight")
+_UNIT_KEYS = ("unit", "weight_unit", "weightUnit")
+_TIME_KEY_SET = frozenset(_TIME_KEYS)
+_WEIGHT_KEY_SET = frozenset(_WEIGHT_KEYS)
+_UNIT_KEY_SET = frozenset(_UNIT_KEYS)
+
+
+# Where device data usually keeps its measurement records, probed before walking the whole response.
+_RECORD_LIST_PATHS = (("data", "list"), ("data", "items"), ("list",), ("items",), ("data",))
 
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return scored[0][1]
+
+def _find_record_list(data_json: Any) -> list[Any] | None:
+    for path in _RECORD_LIST_PATHS:
+        node = data_json
+        for key in path:
+            if not isinstance(node, dict):
+                node = None
+                break
+            node = node.get(key)
+        if isinstance(node, list):
+            return node
+    return None
 
 
 def _extract_latest_weight(data_json: Any) -> tuple[float, str | None]:
     best_weight: float | None = None
     best_time: str | None = None
 
-    time_keys = ("time", "timestamp", "measureTime", "measuredAt", "created_at", "createdAt", "date")
-    weight_keys = ("weight", "weight_kg", "weightKg", "body_weight", "bodyWeight")
-    unit_keys = ("unit", "weight_unit", "weightUnit")
+    records = _find_record_list(data_json)
+    if records is not None:
+        best_weight, best_time = _scan_latest_weight(records)
+    if best_weight is None:
+        best_weight, best_time = _scan_latest_weight(data_json)
+
+    if best_weight is None:
+        raise RuntimeError("Could not find a weight value in device data")
+
+    return best_weight, best_time
+
+
+def _scan_latest_weight(root: Any) -> tuple[float | None, str | None]:
+    best_weight: float | None = None
+    best_time: _Timestamp | None = None
+
+    for node in _iter_dicts(root):
+        keys = node.keys()
+        if keys.isdisjoint(_WEIGHT_KEY_SET):
+            continue
 
-    for node in _iter_dicts(data_json):
         found_weight = None
-        for key in weight_keys:
+        for key in _WEIGHT_KEYS:
             value = node.get(key)
             if isinstance(value, (int, float)):
                 found_weight = float(value)
@@ -198,47 +373,67 @@ def _extract_latest_weight(data_json: Any) -> tuple[float, str | None]:
             continue
 
         unit = None
-        for key in unit_keys:
-            val = node.get(key)
-            if isinstance(val, str) and val.strip():
-                unit = val
-                break
+        if not keys.isdisjoint(_UNIT_KEY_SET):
+            for key in _UNIT_KEYS:
+                val = node.get(key)
+                if isinstance(val, str) and val.strip():
+                    unit = val
+                    break
 
-        time_iso = None
-        for key in time_keys:
-            time_iso = _parse_time(node.get(key))
-            if time_iso:
-                break
+        measured = None
+        if not keys.isdisjoint(_TIME_KEY_SET):
+            for key in _TIME_KEYS:
+                measured = _parse_time(node.get(key))
+                if measured is not None:
+                    break
 
         weight_kg = _to_kg(found_weight, unit)
         if best_weight is None:
             best_weight = weight_kg
-            best_time = time_iso
+            best_time = measured
             continue
 
-        if time_iso and (best_time is None or time_iso > best_time):
+        if measured is not None and (best_time is None or measured.epoch > best_time.epoch):
             best_weight = weight_kg
-            best_time = time_iso
+            best_time = measured
 
-    if best_weight is None:
-        raise RuntimeError("Could not find a weight value in device data")
-
-    return best_weight, best_time
+    return best_weight, best_time.iso if best_time is not None else None
 
 
 def _read_previous_snapshot(path: Path) -> dict[str, Any]:
-    if not path.exists():
+    try:
+        st = path.stat()
+    except OSError:
         return {}
+    # Copy so callers never mutate the cached dict.
+    return dict(_read_snapshot_cached(str(path), st.st_mtime_ns, st.st_size))
+
+
+# Keyed on mtime and size so a rerun in the same process only re-parses the file after it changes.
+@functools.lru_cache(maxsize=4)
+def _read_snapshot_cached(path_str: str, mtime_ns: int, size: int) -> dict[str, Any]:
     try:
-        raw = path.read_text(encoding="utf-8")
-        data = json.loads(raw)
+        data = _json_loads(Path(path_str).read_bytes())
         if isinstance(data, dict):
             return data
         return {}
-    except (OSError, json.JSONDecodeError):
+    except (OSError, ValueError):
         return {}
 
 
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_suffix(".tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
+
+
 def _to_float(value: Any) -> float | None:
     if isinstance(value, (int, float)):
         return float(value)
@@ -288,6 +483,7 @@ def main() -> int:
     }
 
     devices_json = _request_json("GET", DEVICES_PATH, headers=api_headers)
+
     device = _pick_scale_device(devices_json)
     device_id = device.get("id") or device.get("device_id") or device.get("deviceId")
     if not device_id:
@@ -297,7 +493,7 @@ def main() -> int:
     data_json = _request_json("GET", data_path, headers=api_headers)
 
     weight_kg, measured_at = _extract_latest_weight(data_json)
-    now_iso = dt.datetime.now(dt.timezone.utc).isoformat().replace("+00:00", "Z")
+    now_iso = _format_utc(dt.datetime.now(dt.timezone.utc))
     previous = _read_previous_snapshot(OUT_PATH)
     previous_initial = _to_float(previous.get("initialWeightKg"))
     initial_weight_kg = previous_initial if previous_initial is not None else weight_kg
@@ -314,9 +510,7 @@ def main() -> int:
     }
 
     OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    tmp_path = OUT_PATH.with_suffix(".tmp")
-    tmp_path.write_text(json.dumps(payload, ensure_ascii=True, indent=2) + "\n", encoding="utf-8")
-    tmp_path.replace(OUT_PATH)
+    _write_atomic(OUT_PATH, _json_dumps(payload, pretty=True) + b"\n")
 
     print(f"Wrote {OUT_PATH} with {payload['weightKg']} kg")
     return 0